@@ -1,10 +1,12 @@
 import subprocess
 import os
 import json
-import zipfile
 import re
 import time
-import sys
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 # Configuration
 BENCH_PATH = "/home/prathamesh/my-bench"  # Replace with your actual Frappe bench path
@@ -12,6 +14,149 @@ DEFAULT_MODULE = "custom_module"  # Default module name for DocTypes
 SITE_NAME = "site1.local"  # Default site name (can be overridden if needed)
 ADMIN_PASSWORD = "admin"  # Default admin password for new site
 
+# sites/apps.txt is only ever updated by create_frappe_app; the later steps
+# assume the generated app is already listed there
+
+_APP_RE = re.compile(r"named\s+([a-z_]+)")
+_DOCTYPE_RE = re.compile(r"([A-Z]\w+)\s*\((.*?)\)(?:,|$)")
+_FIELD_RE = re.compile(r"(\w+):\s*([A-Za-z]+(?:\[[^\]]*\])?)")
+
+# DocType JSON is read by Frappe, not people: write it compact unless
+# BENCHAUTO_PRETTY is set for debugging
+_PRETTY_DOCTYPE_JSON = bool(os.environ.get("BENCHAUTO_PRETTY"))
+_COMPACT = (",", ":")
+
+# Part of the prompt cache key: bump whenever the generated file templates
+# change so that zips cached by an older version are not reused
+_TEMPLATE_VERSION = "1"
+
+# Every generated DocType shares the same permissions and boilerplate, so the
+# constant parts are encoded once and create_doctype only formats in the
+# per-DocType values
+_PERMISSIONS_JSON = json.dumps([
+    {
+        "role": "System Manager",
+        "read": 1,
+        "write": 1,
+        "create": 1,
+        "delete": 1,
+        "submit": 0,
+        "cancel": 0,
+        "amend": 0,
+        "report": 1,
+        "import": 1,
+        "export": 1
+    }
+], separators=_COMPACT)
+_DOCTYPE_JSON_TEMPLATE = (
+    '{{"name":{name},"module":{module},"doctype":"DocType","custom":0,"fields":{fields},'
+    '"issingle":0,"istable":0,"editable_grid":1,"quick_entry":1,"track_changes":1,'
+    '"permissions":{permissions},"sort_field":"modified","sort_order":"DESC",'
+    '"autoname":{autoname},"title_field":{title_field},"search_fields":{search_fields}}}'
+)
+
+# Top-level `app_*` assignments in hooks.py (ignores commented-out examples)
+_HOOK_ASSIGN_RE = re.compile(r"^(app_\w+)\s*=", re.M)
+
+# Cache maintenance run inside the same Frappe session as the forced install,
+# instead of separate bench clear-cache / clear-website-cache processes
+_CACHE_CLEANUP_SCRIPT = """
+import frappe.website.utils
+frappe.clear_cache()
+frappe.website.utils.clear_cache()
+bench_apps = frappe.get_all_apps()
+stale_apps = [app for app in frappe.get_all("Installed Application", pluck="app_name") if app not in bench_apps]
+if stale_apps:
+    frappe.db.delete("Installed Application", {"app_name": ("in", stale_apps)})
+"""
+
+def run_frappe_session(script, **kwargs):
+    """
+    Run a Python snippet with the bench's own interpreter, connected to SITE_NAME.
+    This calls the Frappe APIs directly instead of going through the bench CLI,
+    so several operations share one import of the Frappe stack.
+    """
+    session = (
+        "import frappe\n"
+        f"frappe.init(site={SITE_NAME!r}, sites_path='.')\n"
+        "frappe.connect()\n"
+        f"{script}\n"
+        "frappe.db.commit()\n"
+        "frappe.destroy()\n"
+    )
+    return subprocess.run(
+        [f"{BENCH_PATH}/env/bin/python", "-c", session], cwd=f"{BENCH_PATH}/sites", **kwargs
+    )
+
+def add_line_if_missing(path, line):
+    """
+    Append line to a small line-per-entry file (apps.txt, modules.txt) unless it
+    is already listed, reading and writing through a single open.
+    Returns True if the line was added.
+    """
+    with open(path, "r+") as f:
+        content = f.read()
+        if line in content.splitlines():
+            return False
+        if content and not content.endswith("\n"):
+            f.write("\n")
+        f.write(f"{line}\n")
+        return True
+
+def write_file(path, data):
+    """Write bytes to path through a raw fd, skipping the buffered file object."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+def iter_files(root, include_dirs=False):
+    """
+    Yield an os.DirEntry for every file under root, walking with os.scandir
+    (no symlinked dirs). With include_dirs, the directories visited are yielded too.
+    """
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    if include_dirs:
+                        yield entry
+                elif entry.is_file():
+                    yield entry
+
+def get_cached_zip(cache_path, app_path):
+    """
+    Return cache_path if it exists and nothing under app_path (bytecode aside)
+    was modified after it was written, else None. Directory mtimes are included
+    so that deleted files and directories also invalidate the cache.
+    """
+    try:
+        cached_mtime = os.stat(cache_path).st_mtime_ns
+        newest_mtime = max(
+            (
+                entry.stat(follow_symlinks=False).st_mtime_ns
+                for entry in iter_files(app_path, include_dirs=True)
+                if entry.name != "__pycache__" and not entry.name.endswith(".pyc")
+            ),
+            default=None
+        )
+        if newest_mtime is not None:
+            newest_mtime = max(newest_mtime, os.stat(app_path).st_mtime_ns)
+    except OSError:  # missing or unreadable cache/app dir: just regenerate
+        return None
+    if newest_mtime is None or newest_mtime > cached_mtime:
+        return None
+    return cache_path
+
+def get_doctype_dir(app_root, doctype_name):
+    """Directory holding a DocType's files inside the app's default module."""
+    return app_root / DEFAULT_MODULE / "doctype" / doctype_name.lower()
+
 # Step 1: Parse the user prompt
 def parse_prompt(prompt):
     """
@@ -21,7 +166,7 @@ def parse_prompt(prompt):
     """
     try:
         # Extract app name
-        app_name_match = re.search(r"named\s+([a-z_]+)", prompt)
+        app_name_match = _APP_RE.search(prompt)
         if not app_name_match:
             raise ValueError("App name not found in prompt")
         app_name = app_name_match.group(1)
@@ -33,19 +178,23 @@ def parse_prompt(prompt):
         doctypes = {}
 
         # Match DocType entries (e.g., "Article (title: Data, ...)")
-        doctype_pattern = r"([A-Z]\w+)\s*\((.*?)\)(?:,|$)"
-        doctype_matches = re.finditer(doctype_pattern, doctype_section)
+        doctype_matches = list(_DOCTYPE_RE.finditer(doctype_section))
 
         if not doctype_matches:
             raise ValueError("No valid DocTypes found in prompt")
 
-        for match in re.finditer(doctype_pattern, doctype_section):
+        seen_names = set()
+        for match in doctype_matches:
             doctype_name, fields_raw = match.groups()
+            # Each DocType gets its own lowercased directory, so names that only
+            # differ in case would overwrite each other's files
+            if doctype_name.lower() in seen_names:
+                raise ValueError(f"Duplicate DocType name (case-insensitive): {doctype_name}")
+            seen_names.add(doctype_name.lower())
             fields = []
 
             # Parse fields (e.g., "title: Data" or "status: Select[Issued,Available]")
-            field_pattern = r"(\w+):\s*([A-Za-z]+(?:\[[^\]]*\])?)"
-            field_matches = re.finditer(field_pattern, fields_raw)
+            field_matches = _FIELD_RE.finditer(fields_raw)
 
             for field_match in field_matches:
                 fname, ftype = field_match.groups()
@@ -76,72 +225,58 @@ def parse_prompt(prompt):
 
 # Step 2: Create a new Frappe app
 def create_frappe_app(app_name):
-    """Use bench CLI to create a new Frappe app."""
+    """Use bench CLI to create a new Frappe app. Returns the app's package directory as a Path."""
     try:
-        os.chdir(BENCH_PATH)
         # First, check if the app already exists and remove it if it does
         app_path = f"{BENCH_PATH}/apps/{app_name}"
         if os.path.exists(app_path):
             print(f"App directory {app_path} already exists. Removing it...")
-            subprocess.run(["rm", "-rf", app_path], check=True)
+            shutil.rmtree(app_path)
         
         # Create the new app
-        subprocess.run(["bench", "new-app", app_name, "--no-git"], check=True)
+        subprocess.run(["bench", "new-app", app_name, "--no-git"], cwd=BENCH_PATH, check=True)
         print(f"Created app: {app_name}")
+        app_root = Path(BENCH_PATH, "apps", app_name, app_name)
         
-        # Verify that hooks.py exists and is accessible
-        hooks_file = f"{BENCH_PATH}/apps/{app_name}/{app_name}/hooks.py"
-        if not os.path.exists(hooks_file):
+        # Update hooks.py to ensure module is recognized; opening it doubles as
+        # the check that it exists
+        hooks_file = app_root / "hooks.py"
+        try:
+            with open(hooks_file, "r+") as f:
+                if "app_modules" not in _HOOK_ASSIGN_RE.findall(f.read()):
+                    f.write(f'\napp_modules = ["{DEFAULT_MODULE}"]\n')
+        except FileNotFoundError:
             raise FileNotFoundError(f"hooks.py file not found at {hooks_file}")
             
         # Add module to modules.txt
-        module_file = f"{BENCH_PATH}/apps/{app_name}/{app_name}/modules.txt"
-        if os.path.exists(module_file):
-            with open(module_file, "r") as f:
-                modules_content = f.read()
-            
-            if DEFAULT_MODULE not in modules_content:
-                with open(module_file, "a") as f:
-                    f.write(f"\n{DEFAULT_MODULE}")
-        else:
-            with open(module_file, "w") as f:
-                f.write(f"{app_name}\n{DEFAULT_MODULE}")
-        
-        # Update hooks.py to ensure module is recognized
-        with open(hooks_file, "r") as f:
-            hooks_content = f.read()
-            
-        if "app_modules" not in hooks_content:
-            with open(hooks_file, "a") as f:
-                f.write(f'\napp_modules = ["{DEFAULT_MODULE}"]\n')
+        module_file = app_root / "modules.txt"
+        try:
+            add_line_if_missing(module_file, DEFAULT_MODULE)
+        except FileNotFoundError:
+            module_file.write_text(f"{app_name}\n{DEFAULT_MODULE}\n")
             
-        # Create module directory and __init__.py
-        module_path = f"{BENCH_PATH}/apps/{app_name}/{app_name}/{DEFAULT_MODULE}"
-        os.makedirs(module_path, exist_ok=True)
+        # Create module and doctype directories (makedirs creates the module
+        # directory on the way to its doctype child)
+        module_path = app_root / DEFAULT_MODULE
+        doctype_path = module_path / "doctype"
+        os.makedirs(doctype_path, exist_ok=True)
         
         # Create __init__.py for module
-        with open(f"{module_path}/__init__.py", "w") as f:
-            f.write("")
-            
-        # Create doctype directory structure
-        doctype_path = f"{module_path}/doctype"
-        os.makedirs(doctype_path, exist_ok=True)
+        (module_path / "__init__.py").write_text("")
         
         # Create __init__.py for doctype path
-        with open(f"{doctype_path}/__init__.py", "w") as f:
-            f.write("")
+        (doctype_path / "__init__.py").write_text("")
             
         print(f"App structure created for {app_name}")
         
-        # Add to installed_apps in sites/apps.txt if not already there
-        apps_file = f"{BENCH_PATH}/sites/apps.txt"
-        if os.path.exists(apps_file):
-            with open(apps_file, "r") as f:
-                installed_apps = f.read().splitlines()
-            
-            if app_name not in installed_apps:
-                with open(apps_file, "a") as f:
-                    f.write(f"\n{app_name}")
+        # Add to installed_apps in sites/apps.txt if not already there (the only
+        # place apps.txt is written, see the note at the top of the module)
+        try:
+            add_line_if_missing(f"{BENCH_PATH}/sites/apps.txt", app_name)
+        except FileNotFoundError:
+            pass
+
+        return app_root
     except subprocess.CalledProcessError as e:
         print(f"Failed to create app: {e}")
         raise
@@ -150,18 +285,14 @@ def create_frappe_app(app_name):
         raise
 
 # Step 3: Create DocType files
-def create_doctype(app_name, doctype_name, fields):
-    """Generate .py and .json files for a DocType."""
+def create_doctype(app_name, doctype_name, fields, *, app_root):
+    """Generate .py and .json files for a DocType (its directory must already exist)."""
     try:
-        app_path = f"{BENCH_PATH}/apps/{app_name}/{app_name}"
-        doctype_dir = f"{app_path}/{DEFAULT_MODULE}/doctype/{doctype_name.lower()}"
+        doctype_dir = get_doctype_dir(app_root, doctype_name)
+        file_stem = doctype_name.lower()
 
-        # Create needed directories
-        os.makedirs(doctype_dir, exist_ok=True)
-        
         # Create __init__.py files for proper Python package structure
-        with open(f"{doctype_dir}/__init__.py", "w") as f:
-            f.write("")
+        (doctype_dir / "__init__.py").touch(exist_ok=True)
 
         # Create .py file
         py_content = f"""from frappe.model.document import Document
@@ -169,45 +300,25 @@ def create_doctype(app_name, doctype_name, fields):
 class {doctype_name}(Document):
     pass
 """
-        with open(f"{doctype_dir}/{doctype_name.lower()}.py", "w") as f:
-            f.write(py_content)
+        write_file(doctype_dir / f"{file_stem}.py", py_content.encode())
 
         # Create .json file with enhanced configuration
-        doctype_json = {
-            "name": doctype_name,
-            "module": DEFAULT_MODULE,
-            "doctype": "DocType",
-            "custom": 0,
-            "fields": fields,
-            "issingle": 0,
-            "istable": 0,
-            "editable_grid": 1,
-            "quick_entry": 1,
-            "track_changes": 1,
-            "permissions": [
-                {
-                    "role": "System Manager",
-                    "read": 1,
-                    "write": 1,
-                    "create": 1,
-                    "delete": 1,
-                    "submit": 0,
-                    "cancel": 0,
-                    "amend": 0,
-                    "report": 1,
-                    "import": 1,
-                    "export": 1
-                }
-            ],
-            "sort_field": "modified",
-            "sort_order": "DESC",
-            "autoname": "field:name" if any(f["fieldname"] == "name" for f in fields) else "prompt",
-            "title_field": "name" if any(f["fieldname"] == "name" for f in fields) else fields[0]["fieldname"],
-            "search_fields": ",".join(field["fieldname"] for field in fields[:3] if field["fieldtype"] in ["Data", "Link", "Select"])
-        }
-        
-        with open(f"{doctype_dir}/{doctype_name.lower()}.json", "w") as f:
-            json.dump(doctype_json, f, indent=2)
+        has_name = any(f["fieldname"] == "name" for f in fields)
+        payload = _DOCTYPE_JSON_TEMPLATE.format(
+            name=json.dumps(doctype_name),
+            module=json.dumps(DEFAULT_MODULE),
+            fields=json.dumps(fields, separators=_COMPACT),
+            permissions=_PERMISSIONS_JSON,
+            autoname='"field:name"' if has_name else '"prompt"',
+            title_field='"name"' if has_name else json.dumps(fields[0]["fieldname"]),
+            search_fields=json.dumps(",".join(
+                field["fieldname"] for field in fields[:3] if field["fieldtype"] in ["Data", "Link", "Select"]
+            ))
+        )
+        if _PRETTY_DOCTYPE_JSON:
+            payload = json.dumps(json.loads(payload), indent=2)
+        payload = payload.encode()
+        write_file(doctype_dir / f"{file_stem}.json", payload)
 
         print(f"Created DocType: {doctype_name}")
     except Exception as e:
@@ -218,82 +329,64 @@ class {doctype_name}(Document):
 def ensure_site_and_install_app(app_name):
     """Check if site exists, create it if not, and install the app."""
     try:
-        os.chdir(BENCH_PATH)
         sites_dir = f"{BENCH_PATH}/sites"
         site_path = f"{sites_dir}/{SITE_NAME}"
 
         # Check if site exists
-        if not os.path.exists(site_path):
+        site_created = not os.path.exists(site_path)
+        if site_created:
             print(f"Site {SITE_NAME} does not exist. Creating it now...")
             # Create new site with default admin password
             subprocess.run(
                 ["bench", "new-site", SITE_NAME, "--admin-password", ADMIN_PASSWORD, "--no-mariadb-socket"],
+                cwd=BENCH_PATH,
                 check=True
             )
             print(f"Created site: {SITE_NAME}")
-
-            # Enable developer mode for the new site
-            subprocess.run(
-                ["bench", "--site", SITE_NAME, "set-config", "developer_mode", "1"],
-                check=True
-            )
-            print(f"Enabled developer mode for site: {SITE_NAME}")
-        
-        # Verify that the app is properly recognized by Frappe
-        apps_path = f"{BENCH_PATH}/sites/apps.txt"
-        with open(apps_path, "r") as f:
-            apps_list = f.read().splitlines()
-        
-        if app_name not in apps_list:
-            print(f"Adding {app_name} to apps.txt...")
-            with open(apps_path, "a") as f:
-                f.write(f"\n{app_name}")
         
-        # Make sure Python can find the app modules
-        print(f"Checking Python path: {sys.path}")
-        app_module_path = f"{BENCH_PATH}/apps/{app_name}"
-        if app_module_path not in sys.path:
-            sys.path.append(app_module_path)
-            print(f"Added {app_module_path} to Python path")
-        
-        # Verify the app's hooks.py is importable
-        try:
-            import importlib
-            hooks_module = f"{app_name}.hooks"
-            importlib.import_module(hooks_module)
-            print(f"Successfully imported {hooks_module}")
-        except ImportError as e:
-            print(f"Warning: Could not import hooks module: {e}")
-            # Create a symlink to the app in the Python path if needed
-            subprocess.run(["ln", "-sf", f"{BENCH_PATH}/apps/{app_name}/{app_name}", f"/usr/local/lib/python3.10/dist-packages/{app_name}"], check=False)
-            print(f"Created symlink for {app_name} module")
-
-        # Install the app into the site
+        # Install the app into the site, enabling developer mode for a new site
+        # in the same Frappe session. install_app syncs the app's DocTypes; if the
+        # app is already installed it is a no-op, so sync the regenerated DocTypes
+        # directly instead of paying for a full migrate
         print(f"Installing app {app_name} into site {SITE_NAME}...")
-        result = subprocess.run(["bench", "--site", SITE_NAME, "install-app", app_name], 
-                                capture_output=True, text=True)
+        install_script = (
+            "from frappe.installer import install_app\n"
+            "from frappe.model.sync import sync_for\n"
+            f"if {app_name!r} in frappe.get_installed_apps():\n"
+            f"    sync_for({app_name!r}, force=True)\n"
+            "else:\n"
+            f"    install_app({app_name!r})"
+        )
+        if site_created:
+            install_script = (
+                "from frappe.installer import update_site_config\n"
+                "update_site_config('developer_mode', 1)\n"
+                f"{install_script}"
+            )
+        result = run_frappe_session(install_script, capture_output=True, text=True)
         
         if result.returncode != 0:
             print(f"Error installing app: {result.stderr}")
             
-            # Try alternative installation method
+            # Try alternative installation method. The generated app has no Python
+            # requirements or frontend assets, so `bench setup requirements` and
+            # `bench build` are not needed here
             print("Trying alternative installation method...")
-            subprocess.run(["bench", "setup", "requirements"], check=True)
-            subprocess.run(["bench", "--site", "all", "clear-cache"], check=True)
-            subprocess.run(["bench", "build"], check=True)
             
-            # Try forcing the installation
-            subprocess.run(["bench", "--site", SITE_NAME, "install-app", app_name, "--force"], check=True)
-        
-        print(f"Installed app: {app_name} into site: {SITE_NAME}")
+            # Clear caches and try forcing the installation in one session
+            run_frappe_session(
+                f"{_CACHE_CLEANUP_SCRIPT}"
+                f"from frappe.installer import install_app\ninstall_app({app_name!r}, force=True)",
+                check=True
+            )
 
-        # Run migrations to ensure DocTypes are registered
-        subprocess.run(["bench", "--site", SITE_NAME, "migrate"], check=True)
-        print(f"Ran migrations for site: {SITE_NAME}")
+            # Run migrations to ensure DocTypes are registered after the forced install
+            subprocess.run(["bench", "--site", SITE_NAME, "migrate"], cwd=BENCH_PATH, check=True)
+            print(f"Ran migrations for site: {SITE_NAME}")
         
-        # Build assets to ensure everything is properly loaded
-        subprocess.run(["bench", "build"], check=True)
-        print(f"Built assets for better UI experience")
+        if site_created:
+            print(f"Enabled developer mode for site: {SITE_NAME}")
+        print(f"Installed app: {app_name} into site: {SITE_NAME}")
         
         # Start bench if it's not already running (in a separate thread to avoid blocking)
         try:
@@ -301,6 +394,7 @@ def ensure_site_and_install_app(app_name):
             if not result.stdout.strip():
                 print("Starting bench server in the background...")
                 subprocess.Popen(["bench", "start"], 
+                                cwd=BENCH_PATH,
                                 stdout=subprocess.DEVNULL, 
                                 stderr=subprocess.DEVNULL)
                 # Wait a bit for server to start
@@ -317,15 +411,18 @@ def ensure_site_and_install_app(app_name):
 # Step 5: Create a zip file of the app
 def create_zip(app_name):
     """Package the app folder into a zip file."""
+    import zipfile  # only needed for this final step, keep it off startup
+
     try:
         app_path = f"{BENCH_PATH}/apps/{app_name}"
         zip_path = f"{BENCH_PATH}/{app_name}.zip"
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-            for root, _, files in os.walk(app_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, f"{BENCH_PATH}/apps")
-                    zipf.write(file_path, arcname)
+        # Level 1 deflate: the scaffold is a handful of small text files, where
+        # higher levels cost several times the CPU for almost no size gain
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zipf:
+            # Archive names are relative to apps/, so slice off that known prefix
+            prefix_len = len(f"{BENCH_PATH}/apps/")
+            for entry in iter_files(app_path):
+                zipf.write(entry.path, entry.path[prefix_len:])
         print(f"Created zip file: {zip_path}")
         return zip_path
     except Exception as e:
@@ -339,18 +436,49 @@ def generate_frappe_app(prompt):
         # Parse the prompt
         app_name, doctypes = parse_prompt(prompt)
 
-        # Create the app
-        create_frappe_app(app_name)
+        # The pipeline is deterministic, so an identical prompt for the same site
+        # whose app is untouched since the last successful run skips regenerating
+        # and re-zipping the app (it is still installed into the site below).
+        # Settings that change the generated files are part of the key too.
+        cache_key = hashlib.blake2b(
+            f"{_TEMPLATE_VERSION}\n{SITE_NAME}\n{DEFAULT_MODULE}\n{_PRETTY_DOCTYPE_JSON}\n{prompt}".encode(),
+            digest_size=16
+        ).hexdigest()
+        cache_path = f"{BENCH_PATH}/.benchauto_cache/{cache_key}.zip"
+        cached_zip = get_cached_zip(cache_path, f"{BENCH_PATH}/apps/{app_name}")
+        if cached_zip:
+            print(f"App '{app_name}' is unchanged since the last run, skipping regeneration")
+        else:
+            # Create the app
+            app_root = create_frappe_app(app_name)
 
-        # Create each DocType
-        for doctype_name, fields in doctypes.items():
-            create_doctype(app_name, doctype_name, fields)
+            # Create all DocType directories in one pass, then write each DocType's
+            # files in parallel (their directories are disjoint, so no locking is needed)
+            for doctype_name in doctypes:
+                os.makedirs(get_doctype_dir(app_root, doctype_name), exist_ok=True)
+            with ThreadPoolExecutor(max_workers=min(16, len(doctypes))) as executor:
+                list(executor.map(lambda item: create_doctype(app_name, *item, app_root=app_root), doctypes.items()))
 
-        # Ensure site exists and install the app
+        # Ensure site exists and install the app; the site may have been recreated
+        # or the app uninstalled even when the app files are unchanged
         ensure_site_and_install_app(app_name)
 
-        # Create and return the zip file
-        zip_path = create_zip(app_name)
+        # Create the zip file, or restore it from the cache to the usual location
+        zip_path = None
+        if cached_zip:
+            try:
+                zip_path = shutil.copyfile(cached_zip, f"{BENCH_PATH}/{app_name}.zip")
+                print(f"Restored zip file from cache: {zip_path}")
+            except OSError as e:
+                print(f"Note: Could not restore the cached zip, rebuilding it: {e}")
+        if zip_path is None:
+            zip_path = create_zip(app_name)
+            # The cache is only an optimisation, so failing to update it is not fatal
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                shutil.copyfile(zip_path, cache_path)
+            except OSError as e:
+                print(f"Note: Could not update the zip cache: {e}")
         
         print(f"\nSUCCESS: App '{app_name}' created with {len(doctypes)} DocTypes!")
         print(f"You can access your Frappe Desk at http://{SITE_NAME}:8000")